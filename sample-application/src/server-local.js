@@ -30,11 +30,19 @@ const storage = multer.diskStorage({
 
 const upload = multer({ storage: storage });
 
+// Remove an uploaded file without blocking the event loop; a missing file is not an error
+function removeUpload(imageUrl) {
+  fs.promises.unlink(path.join(__dirname, '..', imageUrl)).catch(error => {
+    if (error.code !== 'ENOENT') console.error('Error deleting upload:', error.message);
+  });
+}
+
 // Routes
 
 // Get all posts
 app.get('/api/posts', (req, res) => {
-  res.json(posts.sort((a, b) => new Date(b.createdAt) - new Date(a.createdAt)));
+  // createdAt is a UTC ISO-8601 string, so string order is chronological order
+  res.json(posts.sort((a, b) => (a.createdAt < b.createdAt) - (a.createdAt > b.createdAt)));
 });
 
 // Get single post
@@ -57,13 +65,14 @@ app.post('/api/posts', upload.single('image'), (req, res) => {
     imageUrl = `/uploads/${req.file.filename}`;
   }
   
+  const now = new Date().toISOString();
   const post = {
     id: postId,
     title,
     content,
     imageUrl,
-    createdAt: new Date().toISOString(),
-    updatedAt: new Date().toISOString()
+    createdAt: now,
+    updatedAt: now
   };
   
   posts.push(post);
@@ -85,10 +94,7 @@ app.put('/api/posts/:id', upload.single('image'), (req, res) => {
   if (req.file) {
     // Delete old image if exists
     if (imageUrl && imageUrl.startsWith('/uploads/')) {
-      const oldImagePath = path.join(__dirname, '..', imageUrl);
-      if (fs.existsSync(oldImagePath)) {
-        fs.unlinkSync(oldImagePath);
-      }
+      removeUpload(imageUrl);
     }
     imageUrl = `/uploads/${req.file.filename}`;
   }
@@ -116,10 +122,7 @@ app.delete('/api/posts/:id', (req, res) => {
   
   // Delete image file if exists
   if (post.imageUrl && post.imageUrl.startsWith('/uploads/')) {
-    const imagePath = path.join(__dirname, '..', post.imageUrl);
-    if (fs.existsSync(imagePath)) {
-      fs.unlinkSync(imagePath);
-    }
+    removeUpload(post.imageUrl);
   }
   
   posts.splice(postIndex, 1);
@@ -136,8 +139,9 @@ app.get('/health', (req, res) => {
 });
 
 // Serve frontend
+const INDEX_HTML = path.join(__dirname, '../public/index.html');
 app.get('/', (req, res) => {
-  res.sendFile(path.join(__dirname, '../public/index.html'));
+  res.sendFile(INDEX_HTML);
 });
 
 app.listen(PORT, () => {
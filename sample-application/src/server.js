@@ -1,11 +1,10 @@
 const express = require('express');
 const rateLimit = require('express-rate-limit');
 const { DynamoDBClient } = require('@aws-sdk/client-dynamodb');
-const { DynamoDBDocumentClient, ScanCommand, GetCommand, PutCommand, UpdateCommand, DeleteCommand } = require('@aws-sdk/lib-dynamodb');
+const { DynamoDBDocumentClient, paginateScan, GetCommand, PutCommand, UpdateCommand, DeleteCommand } = require('@aws-sdk/lib-dynamodb');
 const { S3Client, PutObjectCommand, DeleteObjectCommand, GetObjectCommand } = require('@aws-sdk/client-s3');
 const { getSignedUrl } = require('@aws-sdk/s3-request-presigner');
 const multer = require('multer');
-const { randomUUID: uuidv4 } = require('crypto');
 const crypto = require('crypto');
 const cors = require('cors');
 const path = require('path');
@@ -27,6 +26,8 @@ const USER_POOL_ID = process.env.COGNITO_USER_POOL_ID;
 const CLIENT_ID = process.env.COGNITO_CLIENT_ID;
 
 let jwks = null;
+let jwksRequest = null;
+const signingKeys = new Map();
 
 // Middleware
 const apiLimiter = rateLimit({ windowMs: 15 * 60 * 1000, max: 100, standardHeaders: true, legacyHeaders: false });
@@ -39,22 +40,35 @@ const storage = multer.memoryStorage();
 const upload = multer({ storage });
 
 // Get JWKS using native fetch (no axios needed)
+// Concurrent callers share one in-flight request instead of each fetching the key set
 async function getJWKS() {
   if (!jwks && USER_POOL_ID) {
-    try {
-      const res = await fetch(`https://cognito-idp.${REGION}.amazonaws.com/${USER_POOL_ID}/.well-known/jwks.json`);
-      jwks = await res.json();
-    } catch (error) {
-      console.error('Failed to get JWKS:', error.message);
+    if (!jwksRequest) {
+      jwksRequest = (async () => {
+        try {
+          const res = await fetch(`https://cognito-idp.${REGION}.amazonaws.com/${USER_POOL_ID}/.well-known/jwks.json`);
+          jwks = await res.json();
+        } catch (error) {
+          console.error('Failed to get JWKS:', error.message);
+        } finally {
+          jwksRequest = null;
+        }
+      })();
     }
+    await jwksRequest;
   }
   return jwks;
 }
 
-// Convert JWK to PEM using native crypto (no jwk-to-pem/elliptic needed)
-function jwkToPem(jwk) {
-  const keyObject = crypto.createPublicKey({ key: jwk, format: 'jwk' });
-  return keyObject.export({ type: 'spki', format: 'pem' });
+// Convert JWK to a public key using native crypto (no jwk-to-pem/elliptic needed)
+// Keys are derived once per key ID and passed to jsonwebtoken as KeyObjects, skipping PEM export and re-parse
+function getSigningKey(jwk) {
+  let key = signingKeys.get(jwk.kid);
+  if (!key) {
+    key = crypto.createPublicKey({ key: jwk, format: 'jwk' });
+    signingKeys.set(jwk.kid, key);
+  }
+  return key;
 }
 
 // Verify JWT token
@@ -67,7 +81,7 @@ async function verifyToken(token) {
     if (!decoded) return null;
     const jwk = jwksData.keys.find(key => key.kid === decoded.header.kid);
     if (!jwk) return null;
-    return jwt.verify(token, jwkToPem(jwk), { algorithms: ['RS256'] });
+    return jwt.verify(token, getSigningKey(jwk), { algorithms: ['RS256'] });
   } catch (error) {
     console.error('Token verification failed:', error.message);
     return null;
@@ -89,26 +103,51 @@ async function authenticateToken(req, res, next) {
 // Get presigned URL for S3 upload
 app.post('/api/upload-url', authenticateToken, async (req, res) => {
   const { fileName, fileType } = req.body;
-  const key = `images/${uuidv4()}-${fileName}`;
-  const command = new PutObjectCommand({ Bucket: S3_BUCKET, Key: key, ContentType: fileType });
-  const uploadUrl = await getSignedUrl(s3, command, { expiresIn: 300 });
-  res.json({ uploadUrl, key });
+  if (!fileName || !fileType) return res.status(400).json({ error: 'fileName and fileType are required' });
+  try {
+    const key = `images/${crypto.randomUUID()}-${fileName}`;
+    const command = new PutObjectCommand({ Bucket: S3_BUCKET, Key: key, ContentType: fileType });
+    const uploadUrl = await getSignedUrl(s3, command, { expiresIn: 300 });
+    res.json({ uploadUrl, key });
+  } catch (error) {
+    console.error('Error creating upload URL:', error);
+    res.status(500).json({ error: 'Failed to create upload URL' });
+  }
 });
 
 // Get presigned URL for S3 download
 app.get('/api/image/:key(*)', authenticateToken, async (req, res) => {
-  const decodedKey = decodeURIComponent(req.params.key);
-  const command = new GetObjectCommand({ Bucket: S3_BUCKET, Key: decodedKey });
-  const downloadUrl = await getSignedUrl(s3, command, { expiresIn: 300 });
-  res.json({ downloadUrl });
+  let decodedKey;
+  try { decodedKey = decodeURIComponent(req.params.key); }
+  catch { return res.status(400).json({ error: 'Invalid image key' }); }
+  try {
+    const command = new GetObjectCommand({ Bucket: S3_BUCKET, Key: decodedKey });
+    const downloadUrl = await getSignedUrl(s3, command, { expiresIn: 300 });
+    res.json({ downloadUrl });
+  } catch (error) {
+    console.error('Error creating download URL:', error);
+    res.status(500).json({ error: 'Failed to create download URL' });
+  }
 });
 
+// Attach a presigned download URL so clients do not need a request per image
+async function withImageUrl(post) {
+  if (!post.imageKey) return post;
+  const command = new GetObjectCommand({ Bucket: S3_BUCKET, Key: post.imageKey });
+  return { ...post, imageUrl: await getSignedUrl(s3, command, { expiresIn: 300 }) };
+}
+
 // Get all posts
 app.get('/api/posts', authenticateToken, async (req, res) => {
   try {
-    const result = await dynamodb.send(new ScanCommand({ TableName: TABLE_NAME }));
-    const posts = result.Items.sort((a, b) => new Date(b.createdAt) - new Date(a.createdAt));
-    res.json(posts);
+    // A single Scan stops at 1 MB of data; page through so larger tables are not truncated
+    const items = [];
+    for await (const page of paginateScan({ client: dynamodb }, { TableName: TABLE_NAME })) {
+      items.push(...page.Items);
+    }
+    // createdAt is a UTC ISO-8601 string, so string order is chronological order
+    const posts = items.sort((a, b) => (a.createdAt < b.createdAt) - (a.createdAt > b.createdAt));
+    res.json(await Promise.all(posts.map(withImageUrl)));
   } catch (error) {
     console.error('Error fetching posts:', error);
     res.status(500).json({ error: 'Failed to fetch posts' });
@@ -119,7 +158,7 @@ app.get('/api/posts', authenticateToken, async (req, res) => {
 app.get('/api/posts/:id', authenticateToken, async (req, res) => {
   try {
     const result = await dynamodb.send(new GetCommand({ TableName: TABLE_NAME, Key: { id: req.params.id } }));
-    if (result.Item) res.json(result.Item);
+    if (result.Item) res.json(await withImageUrl(result.Item));
     else res.status(404).json({ error: 'Post not found' });
   } catch (error) {
     console.error('Error fetching post:', error);
@@ -131,7 +170,8 @@ app.get('/api/posts/:id', authenticateToken, async (req, res) => {
 app.post('/api/posts', authenticateToken, upload.single('image'), async (req, res) => {
   try {
     const { title, content, imageKey } = req.body;
-    const postId = uuidv4();
+    if (!title || !content) return res.status(400).json({ error: 'title and content are required' });
+    const postId = crypto.randomUUID();
     let finalImageKey = imageKey;
 
     if (req.file && !imageKey) {
@@ -140,13 +180,14 @@ app.post('/api/posts', authenticateToken, upload.single('image'), async (req, re
       finalImageKey = uploadKey;
     }
 
+    const now = new Date().toISOString();
     const post = {
       id: postId, title, content, imageKey: finalImageKey,
       author: req.user.email || req.user.username || 'Anonymous',
-      createdAt: new Date().toISOString(), updatedAt: new Date().toISOString()
+      createdAt: now, updatedAt: now
     };
     await dynamodb.send(new PutCommand({ TableName: TABLE_NAME, Item: post }));
-    res.status(201).json(post);
+    res.status(201).json(await withImageUrl(post));
   } catch (error) {
     console.error('Error creating post:', error);
     res.status(500).json({ error: 'Failed to create post' });
@@ -155,29 +196,41 @@ app.post('/api/posts', authenticateToken, upload.single('image'), async (req, re
 
 // Update post
 app.put('/api/posts/:id', authenticateToken, upload.single('image'), async (req, res) => {
+  const { title, content, imageKey } = req.body;
+  const postId = req.params.id;
+  if (!title || !content) return res.status(400).json({ error: 'title and content are required' });
+  let uploadKey = null;
   try {
-    const { title, content, imageKey } = req.body;
-    const postId = req.params.id;
-    const existingPost = await dynamodb.send(new GetCommand({ TableName: TABLE_NAME, Key: { id: postId } }));
-    if (!existingPost.Item) return res.status(404).json({ error: 'Post not found' });
-
-    let finalImageKey = existingPost.Item.imageKey;
     if (req.file) {
-      const uploadKey = `images/${postId}-${Date.now()}.${req.file.originalname.split('.').pop()}`;
+      uploadKey = `images/${postId}-${Date.now()}.${req.file.originalname.split('.').pop()}`;
       await s3.send(new PutObjectCommand({ Bucket: S3_BUCKET, Key: uploadKey, Body: req.file.buffer, ContentType: req.file.mimetype }));
-      finalImageKey = uploadKey;
-    } else if (imageKey) {
-      finalImageKey = imageKey;
+    }
+
+    // Conditional update checks existence in the same call; imageKey is only replaced when a new one is given
+    const finalImageKey = uploadKey || imageKey;
+    const values = { ':title': title, ':content': content, ':updatedAt': new Date().toISOString() };
+    let updateExpression = 'SET title = :title, content = :content, updatedAt = :updatedAt';
+    if (finalImageKey) {
+      updateExpression += ', imageKey = :imageKey';
+      values[':imageKey'] = finalImageKey;
     }
 
     const result = await dynamodb.send(new UpdateCommand({
       TableName: TABLE_NAME, Key: { id: postId },
-      UpdateExpression: 'SET title = :title, content = :content, imageKey = :imageKey, updatedAt = :updatedAt',
-      ExpressionAttributeValues: { ':title': title, ':content': content, ':imageKey': finalImageKey, ':updatedAt': new Date().toISOString() },
+      UpdateExpression: updateExpression,
+      ConditionExpression: 'attribute_exists(id)',
+      ExpressionAttributeValues: values,
       ReturnValues: 'ALL_NEW'
     }));
-    res.json(result.Attributes);
+    res.json(await withImageUrl(result.Attributes));
   } catch (error) {
+    if (error.name === 'ConditionalCheckFailedException') {
+      if (uploadKey) {
+        s3.send(new DeleteObjectCommand({ Bucket: S3_BUCKET, Key: uploadKey }))
+          .catch(s3Error => console.error('Error deleting image from S3:', s3Error));
+      }
+      return res.status(404).json({ error: 'Post not found' });
+    }
     console.error('Error updating post:', error);
     res.status(500).json({ error: 'Failed to update post' });
   }
@@ -190,12 +243,16 @@ app.delete('/api/posts/:id', authenticateToken, async (req, res) => {
     const existingPost = await dynamodb.send(new GetCommand({ TableName: TABLE_NAME, Key: { id: postId } }));
     if (!existingPost.Item) return res.status(404).json({ error: 'Post not found' });
 
-    if (existingPost.Item.imageKey) {
-      try { await s3.send(new DeleteObjectCommand({ Bucket: S3_BUCKET, Key: existingPost.Item.imageKey })); }
-      catch (s3Error) { console.error('Error deleting image from S3:', s3Error); }
-    }
+    // Image and record deletes are independent, so issue them together
+    const deleteImage = existingPost.Item.imageKey
+      ? s3.send(new DeleteObjectCommand({ Bucket: S3_BUCKET, Key: existingPost.Item.imageKey }))
+          .catch(s3Error => console.error('Error deleting image from S3:', s3Error))
+      : null;
 
-    await dynamodb.send(new DeleteCommand({ TableName: TABLE_NAME, Key: { id: postId } }));
+    await Promise.all([
+      deleteImage,
+      dynamodb.send(new DeleteCommand({ TableName: TABLE_NAME, Key: { id: postId } }))
+    ]);
     res.json({ message: 'Post deleted successfully' });
   } catch (error) {
     console.error('Error deleting post:', error);
@@ -203,18 +260,19 @@ app.delete('/api/posts/:id', authenticateToken, async (req, res) => {
   }
 });
 
-// Health check
+// Health check (configuration fields are fixed for the life of the process)
+const HEALTH_CONFIG = {
+  cognito: !!USER_POOL_ID, s3Bucket: S3_BUCKET, dynamoTable: TABLE_NAME,
+  userPoolId: USER_POOL_ID, clientId: CLIENT_ID, region: REGION
+};
 app.get('/health', (req, res) => {
-  res.json({
-    status: 'healthy', timestamp: new Date().toISOString(),
-    cognito: !!USER_POOL_ID, s3Bucket: S3_BUCKET, dynamoTable: TABLE_NAME,
-    userPoolId: USER_POOL_ID, clientId: CLIENT_ID, region: REGION
-  });
+  res.json({ status: 'healthy', timestamp: new Date().toISOString(), ...HEALTH_CONFIG });
 });
 
 // Serve frontend
+const INDEX_HTML = path.join(__dirname, '../public/index.html');
 app.get('/', (req, res) => {
-  res.sendFile(path.join(__dirname, '../public/index.html'));
+  res.sendFile(INDEX_HTML);
 });
 
 app.listen(PORT, () => {
@@ -54,7 +54,7 @@ for STACK_NAME in $CDK_STACKS; do
     # Stop application service if instance exists
     if [ -n "$INSTANCE_ID" ]; then
         echo "🛑 Stopping application service..."
-        aws ssm send-command \
+        CLEANUP_CMD_ID=$(aws ssm send-command \
             --instance-ids "$INSTANCE_ID" \
             --document-name "AWS-RunShellScript" \
             --region "$REGION" \
@@ -63,10 +63,15 @@ for STACK_NAME in $CDK_STACKS; do
                 "sudo systemctl disable blog-app || true",
                 "rm -rf /home/ec2-user/blog-app*"
             ]' \
-            --output text --query 'Command.CommandId' 2>/dev/null || true
+            --output text --query 'Command.CommandId' 2>/dev/null || true)
         
-        echo "⏳ Waiting for service cleanup..."
-        sleep 10
+        if [ -n "$CLEANUP_CMD_ID" ]; then
+            echo "⏳ Waiting for service cleanup..."
+            aws ssm wait command-executed \
+                --command-id "$CLEANUP_CMD_ID" \
+                --instance-id "$INSTANCE_ID" \
+                --region "$REGION" 2>/dev/null || true
+        fi
     fi
     
     # Empty S3 bucket if it exists (required for deletion)
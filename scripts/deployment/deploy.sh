@@ -11,6 +11,32 @@
 
 set -e
 
+# Poll an SSM command invocation until it finishes or the timeout (seconds) expires.
+# The built-in "aws ssm wait command-executed" waiter gives up after 100 seconds,
+# which is too short for a first deploy that installs Node.js.
+wait_for_ssm_command() {
+    local command_id="$1"
+    local timeout="$2"
+    local elapsed=0
+    local status
+    while [ "$elapsed" -lt "$timeout" ]; do
+        status=$(aws ssm get-command-invocation \
+            --command-id "$command_id" \
+            --instance-id "$INSTANCE_ID" \
+            --region "$REGION" \
+            --query 'Status' \
+            --output text 2>/dev/null || echo "Pending")
+        case "$status" in
+            Pending|InProgress|Delayed) ;;
+            Success) return 0 ;;
+            *) return 1 ;;
+        esac
+        sleep 5
+        elapsed=$((elapsed + 5))
+    done
+    return 1
+}
+
 # Check required tools
 echo "🔍 Checking required tools..."
 MISSING_TOOLS=()
@@ -76,12 +102,20 @@ fi
 echo "📋 Extracting stack outputs..."
 cd ../../scripts/deployment
 
-# Extract values from CDK outputs
-USER_POOL_ID=$(jq -r '.BlogAppStack.UserPoolId' stack-outputs.json)
-CLIENT_ID=$(jq -r '.BlogAppStack.UserPoolClientId' stack-outputs.json)
-S3_BUCKET=$(jq -r '.BlogAppStack.S3BucketName' stack-outputs.json)
-DYNAMODB_TABLE=$(jq -r '.BlogAppStack.DynamoDBTableName' stack-outputs.json)
-INSTANCE_ID=$(jq -r '.BlogAppStack.SSMCommand' stack-outputs.json | grep -o 'i-[a-zA-Z0-9]*')
+# Extract values from CDK outputs in a single jq pass, one value per line so a
+# missing output becomes an empty variable instead of shifting the others
+{
+    read -r USER_POOL_ID
+    read -r CLIENT_ID
+    read -r S3_BUCKET
+    read -r DYNAMODB_TABLE
+    read -r INSTANCE_ID
+    read -r APP_URL
+} < <(
+    jq -r '.BlogAppStack | [
+        .UserPoolId // "", .UserPoolClientId // "", .S3BucketName // "", .DynamoDBTableName // "",
+        ((.SSMCommand // "" | capture("(?<id>i-[a-zA-Z0-9]+)").id) // ""), .ApplicationURL // ""
+    ] | .[]' stack-outputs.json)
 
 # Auto-detect region from stack outputs (extract from S3 bucket name or User Pool ID)
 REGION=$(echo "$USER_POOL_ID" | cut -d'_' -f1)
@@ -163,24 +197,26 @@ S3_BUCKET=$S3_BUCKET
 COGNITO_USER_POOL_ID=$USER_POOL_ID
 COGNITO_CLIENT_ID=$CLIENT_ID
 EOF\",
-        \"# Install Node.js 22 (required for multer 2.x compatibility)\",
-        \"curl -fsSL https://rpm.nodesource.com/setup_22.x | sudo bash - && sudo dnf remove -y nodejs nodejs-libs nodejs-full-i18n || true && sudo dnf install -y nodejs\",
+        \"# Install Node.js 22 (required for multer 2.x compatibility), skipped on redeploys\",
+        \"if node --version 2>/dev/null | grep -q '^v22'; then echo 'Node.js 22 already installed'; else curl -fsSL https://rpm.nodesource.com/setup_22.x | sudo bash - && sudo dnf remove -y nodejs nodejs-libs nodejs-full-i18n || true && sudo dnf install -y nodejs; fi\",
         \"echo \\\"Node.js version: \$(node --version)\\\"\",
         \"# Install dependencies and start application\",
         \"npm install\",
         \"echo 'Final file sizes:'\",
         \"echo \\\"  server.js: \$(wc -c < src/server.js) bytes\\\"\",
         \"echo \\\"  index.html: \$(wc -c < public/index.html) bytes\\\"\",
+        \"# Bind to 0.0.0.0 so the ALB can reach the app over IPv4\",
+        \"sed -i 's/app.listen(PORT, () => {/app.listen(PORT, \\\"0.0.0.0\\\", () => {/' src/server.js\",
         \"pkill -f 'node src/server.js' || echo 'No existing processes'\",
         \"nohup node src/server.js > app.log 2>&1 &\",
-        \"sleep 5\",
+        \"for i in \$(seq 1 30); do curl -sf http://localhost:3000/health > /dev/null && break; sleep 1; done\",
         \"curl -s http://localhost:3000/health | jq . || echo 'Health check endpoint not available'\",
         \"ps aux | grep 'node src/server.js' | grep -v grep || echo 'Application not running'\"
     ]" \
     --output text --query 'Command.CommandId')
 
 echo "⏳ Waiting for deployment to complete..."
-sleep 30
+wait_for_ssm_command "$DEPLOY_CMD_ID" 600 || echo "⚠️  Deployment command did not finish successfully, showing its output"
 
 # Check deployment status
 aws ssm get-command-invocation \
@@ -190,21 +226,6 @@ aws ssm get-command-invocation \
     --query 'StandardOutputContent' \
     --output text
 
-echo "🔧 Ensuring application binds to IPv4..."
-# Fix IPv4 binding
-aws ssm send-command \
-    --instance-ids "$INSTANCE_ID" \
-    --document-name "AWS-RunShellScript" \
-    --region "$REGION" \
-    --parameters 'commands=[
-        "cd /home/ec2-user/blog-app",
-        "pkill -f \"node src/server.js\" || echo \"No existing processes\"",
-        "sed -i \"s/app.listen(PORT, () => {/app.listen(PORT, \\\"0.0.0.0\\\", () => {/\" src/server.js",
-        "nohup node src/server.js > app.log 2>&1 &",
-        "sleep 5"
-    ]' \
-    --output text --query 'Command.CommandId' > /dev/null
-
 echo "⏳ Waiting for health checks to pass..."
 sleep 60
 
@@ -238,7 +259,7 @@ TEST_CMD_ID=$(aws ssm send-command \
     --output text --query 'Command.CommandId')
 
 echo "⏳ Waiting for SSM tests to complete..."
-sleep 15
+wait_for_ssm_command "$TEST_CMD_ID" 120 || echo "⚠️  Test command did not finish successfully, showing its output"
 
 # Get and display test results
 echo "📊 SSM Test Results:"
@@ -250,7 +271,6 @@ aws ssm get-command-invocation \
     --output text
 
 # Validate deployment
-APP_URL=$(jq -r '.BlogAppStack.ApplicationURL' stack-outputs.json 2>/dev/null)
 if [ -n "$APP_URL" ]; then
     echo "🔍 Validating deployment..."
     
@@ -43,8 +43,8 @@ echo "🔧 Configure kubectl:"
 echo "  $CONFIG_CMD"
 echo ""
 
-echo "⏳ Waiting 60 seconds for cluster to be ready..."
-sleep 60
+echo "⏳ Waiting for cluster to be active..."
+aws eks wait cluster-active --name "$CLUSTER_NAME" --region "$REGION"
 
 echo "🔍 Verifying cluster..."
 aws eks describe-cluster --name "$CLUSTER_NAME" --region "$REGION" --query 'cluster.status' --output text